@@ -1,27 +1,27 @@
+import pandas as pd
+from sheet_client import get_client
 
-import gspread
-from google.oauth2.service_account import Credentials
-
-CREDENTIALS_FILE = "service_account.json"
 SHEET_URL = "https://docs.google.com/spreadsheets/d/1iiQvatTj9t0aYqcRS8i5Brxd-FezGmRHOGq5PlI1Qks"
-SCOPE = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
 
 def count_leads():
-    creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPE)
-    client = gspread.authorize(creds)
+    client = get_client()
     sheet = client.open_by_url(SHEET_URL)
     worksheet = sheet.get_worksheet(0)
-    records = worksheet.get_all_records()
-    print(f"Total leads in sheet: {len(records)}")
+
+    # Raw values skip gspread's per-row dict construction
+    values = worksheet.get_values()
+    if not values:
+        print("Total leads in sheet: 0")
+        return
+    df = pd.DataFrame(values[1:], columns=values[0])
+    print(f"Total leads in sheet: {len(df)}")
     
     # Count leads with emails
-    with_email = [r for r in records if r.get('emails')]
-    print(f"Leads with emails: {len(with_email)}")
+    with_email = int(df['emails'].astype(bool).sum())
+    print(f"Leads with emails: {with_email}")
     
     # Check for duplicates by lead_id
-    ids = [r.get('lead_id') for r in records]
-    unique_ids = set(ids)
-    print(f"Unique leads by ID: {len(unique_ids)}")
+    print(f"Unique leads by ID: {df['lead_id'].nunique()}")
 
 if __name__ == "__main__":
     count_leads()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Local cache of website contact scrapes, keyed by normalized website URL.
+
+Entries younger than the TTL are reused as-is. Older entries are revalidated
+with a conditional HEAD request (If-None-Match / If-Modified-Since) using the
+homepage's ETag/Last-Modified captured at scrape time; a 304 (or unchanged
+validators) keeps the cached contacts, anything else means rescrape.
+
+Usage:
+    cached = contacts_cache.lookup(website, ttl_days=7)
+    if cached is None:
+        cached = scrape_website_contacts_sync(website, name)
+        contacts_cache.store(website, cached)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import contextlib
+from urllib.parse import urlparse
+
+import httpx
+
+CACHE_PATH = ".tmp/contacts_cache.sqlite"
+DEFAULT_TTL_DAYS = 7
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a website URL: lowercase host without www, no scheme/trailing slash."""
+    parsed = urlparse(url if "//" in url else f"//{url}")
+    host = parsed.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return f"{host}{parsed.path.rstrip('/')}"
+
+
+def _key(url: str) -> str:
+    return hashlib.sha1(normalize_url(url).encode()).hexdigest()
+
+
+@contextlib.contextmanager
+def _connect():
+    """Open the cache DB (one connection per call, so it's safe from worker threads)."""
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH, timeout=30)
+    try:
+        with conn:  # commit on success, rollback on error
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS contacts (
+                    url_hash TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL,
+                    contacts_json TEXT
+                )"""
+            )
+            yield conn
+    finally:
+        conn.close()
+
+
+def _revalidate(url: str, etag: str, last_modified: str) -> bool:
+    """Conditional HEAD against the homepage. True if the page is unchanged."""
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    if not headers:
+        return False
+
+    if not url.startswith("http"):
+        url = "http://" + url
+    try:
+        resp = httpx.head(url, headers=headers, follow_redirects=True, timeout=10)
+    except httpx.HTTPError:
+        return False
+
+    if resp.status_code == 304:
+        return True
+    # Some servers ignore conditional headers on HEAD but still send validators
+    if resp.status_code == 200:
+        if etag and resp.headers.get("etag") == etag:
+            return True
+        if not etag and last_modified and resp.headers.get("last-modified") == last_modified:
+            return True
+    return False
+
+
+def lookup(url: str, ttl_days: float = DEFAULT_TTL_DAYS) -> dict | None:
+    """
+    Return cached contacts for a website, or None if it needs a fresh scrape.
+    """
+    if not url:
+        return None
+
+    key = _key(url)
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT etag, last_modified, fetched_at, contacts_json FROM contacts WHERE url_hash = ?",
+            (key,)
+        ).fetchone()
+    if not row:
+        return None
+
+    etag, last_modified, fetched_at, contacts_json = row
+    if time.time() - fetched_at < ttl_days * 86400:
+        return json.loads(contacts_json)
+
+    if _revalidate(url, etag, last_modified):
+        with _connect() as conn:
+            conn.execute("UPDATE contacts SET fetched_at = ? WHERE url_hash = ?", (time.time(), key))
+        return json.loads(contacts_json)
+
+    return None
+
+
+def store(url: str, contacts: dict) -> None:
+    """
+    Cache a scrape result. Errored scrapes are not cached so they get retried,
+    including ones whose homepage fetch failed (no "error" key, but nothing
+    was scraped).
+    """
+    if not url or not contacts or contacts.get("error") or not contacts.get("_pages_scraped"):
+        return
+
+    with _connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO contacts VALUES (?, ?, ?, ?, ?)",
+            (
+                _key(url),
+                contacts.get("_etag", ""),
+                contacts.get("_last_modified", ""),
+                time.time(),
+                json.dumps(contacts),
+            )
+        )
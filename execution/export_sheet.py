@@ -1,29 +1,28 @@
-
-import gspread
-import pandas as pd
-from google.oauth2.service_account import Credentials
+import csv
+from sheet_client import get_client
 import os
 from datetime import datetime
 
-CREDENTIALS_FILE = "service_account.json"
 SHEET_URL = "https://docs.google.com/spreadsheets/d/1iiQvatTj9t0aYqcRS8i5Brxd-FezGmRHOGq5PlI1Qks"
-SCOPE = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
 
 def export_to_csv():
-    creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPE)
-    client = gspread.authorize(creds)
+    client = get_client()
     sheet = client.open_by_url(SHEET_URL)
     worksheet = sheet.get_worksheet(0)
-    data = worksheet.get_all_records()
-    df = pd.DataFrame(data)
+    # Raw 2-D values: no per-row dict construction just to round-trip to CSV
+    values = worksheet.get_values()
     
     timestamp = datetime.now().strftime("%Y-%m-%d")
     output_dir = f"scrape/{timestamp}"
     os.makedirs(output_dir, exist_ok=True)
     
+    # No transformations happen on export, so write the rows straight out
+    # with csv.writer rather than going through a DataFrame
     filename = f"{output_dir}/dentists_bc_full_export.csv"
-    df.to_csv(filename, index=False)
-    print(f"Exported {len(df)} leads to {filename}")
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerows(values)
+    print(f"Exported {max(len(values) - 1, 0)} leads to {filename}")
 
 if __name__ == "__main__":
     export_to_csv()
@@ -1,84 +1,322 @@
 import re
+import json
+import hashlib
+import html as html_lib
+import asyncio
+import atexit
+import ssl
+import threading
+import weakref
+import certifi
 import httpx
 import logging
 import sys
 import os
 import random
 import time
-from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
-import html2text
+from pathlib import Path
+from urllib.parse import urljoin, urlparse, unquote
+from bs4 import BeautifulSoup, SoupStrainer
 from dotenv import load_dotenv
 
+# google-re2 gives linear-time (DFA) matching for the email scan; it only
+# supports lookaround-free patterns, so the email regex below stays that way
+try:
+    import re2 as _email_re_engine
+except ImportError:
+    _email_re_engine = re
+
 load_dotenv()
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Extensions to ignore in email regex/crawling
-IGNORED_EXTS = ('.png', '.jpg', '.jpeg', '.gif', '.css', '.js', '.svg', '.woff', '.mp4', '.pdf', '.zip')
+# Placeholder addresses from templates and form hints
+_JUNK = frozenset({'name@example.com', 'email@address.com', 'you@yourdomain.com'})
+
+# Path keywords that mark Contact/About/Team pages worth a sub-page fetch
+CONTACT_KEYWORDS = ('contact', 'about', 'team', 'staff', 'people', 'leadership')
+MAX_CONTACT_PAGES = 4
+SOCIAL_PLATFORMS = ('facebook', 'twitter', 'linkedin', 'instagram', 'youtube', 'tiktok')
+
+# Emails almost never live past the first megabyte; some sites ship 5-20 MB
+# of inline images/JSON, so stop reading a page after this many bytes
+MAX_HTML_BYTES = 2_000_000
+BINARY_CONTENT_TYPES = (
+    'image/', 'video/', 'audio/', 'font/',
+    'application/pdf', 'application/zip', 'application/octet-stream'
+)
+
+# Compiled once at import; extract_emails runs on every page and DDG snippet.
+# Every run is bounded and domain labels are split on '.', so no two adjacent
+# classes can both consume a dot - keeps scanning linear on base64/minified junk
+# even on the stdlib engine.
+_EMAIL_RE = _email_re_engine.compile(
+    r'\b[A-Za-z0-9._%+\-]{1,64}@[A-Za-z0-9\-]{1,63}(?:\.[A-Za-z0-9\-]{1,63}){0,4}\.[A-Za-z]{2,24}\b'
+)
+
+# Asset filenames like logo@2x.png look like emails; checked per match (RE2
+# can't express this as a lookahead) with an O(1) lookup on the final suffix
+_BAD_EXT = frozenset({
+    'png', 'jpg', 'jpeg', 'gif', 'css', 'js', 'svg', 'woff', 'woff2',
+    'mp4', 'pdf', 'zip', 'webp', 'ico'
+})
+
+# Markup that never holds a real contact email: scripts (except JSON-LD, which
+# often carries schema.org "email"), styles, comments and inline data: URIs.
+# Stripping these first shrinks the text the email regex has to walk.
+_STRIP_RE = re.compile(
+    r'<script\b(?![^>]*ld\+json)[^>]*>.*?</script>'
+    r'|<style\b[^>]*>.*?</style>'
+    r'|<!--.*?-->'
+    r'|data:[A-Za-z0-9/+;=,]{200,}',
+    re.DOTALL | re.IGNORECASE
+)
+
+# Linear tag strip; mailto: targets live inside tags, so collect them first
+_TAG_RE = re.compile(r'<[^>]+>')
+_MAILTO_RE = re.compile(r'mailto:([^"\'?>\s]+)', re.IGNORECASE)
+
+# One C-level search per link instead of a Python loop over platforms.
+# x.com is reported under 'twitter' to match the sheet's column.
+_SOCIAL_RE = re.compile(r'\b(facebook|twitter|x|linkedin|instagram|youtube|tiktok)\.com\b', re.IGNORECASE)
+
+# Link analysis only ever looks at <a href>, so only build those nodes
+_ANCHOR_STRAINER = SoupStrainer('a', href=True)
+
+# On-disk page cache so retries/debug runs and repeat domains skip the
+# network. Only the already-truncated HTML from fetch_html is stored, so the
+# size cap and binary check still apply before anything is downloaded in
+# full. Expired entries are deleted (at the first write, then at most every
+# HTTP_CACHE_PRUNE_INTERVAL seconds). Set HTTP_CACHE_TTL=0 to disable.
+HTTP_CACHE_DIR = Path(".tmp/httpcache")
+HTTP_CACHE_TTL = int(os.getenv("HTTP_CACHE_TTL", 86400))
+HTTP_CACHE_PRUNE_INTERVAL = 3600
+_last_prune = 0.0
+_prune_lock = threading.Lock()
+
+# Built once and shared by every verifying client so OpenSSL's session cache
+# is reused (resumed handshakes skip the key exchange). Sites with broken
+# certs get a one-time retry through an unverified client.
+_SSL_CONTEXT = ssl.create_default_context(cafile=certifi.where())
+_SSL_CONTEXT.set_ciphers('ECDHE+AESGCM:ECDHE+CHACHA20')
+
+def _fast_html_to_text(html: str) -> str:
+    """
+    Cheap HTML -> text for email extraction (no Markdown conversion).
+
+    Entities are decoded after the tag strip so obfuscated addresses like
+    info&#64;clinic.com (or WordPress antispambot's fully encoded ones)
+    still match; mailto targets are also percent-decoded (info%40...).
+    """
+    html = _STRIP_RE.sub(' ', html)
+    mailtos = ' '.join(unquote(html_lib.unescape(m)) for m in _MAILTO_RE.findall(html))
+    return f"{html_lib.unescape(_TAG_RE.sub(' ', html))} {mailtos}"
+
+def build_client(verify: bool = True) -> httpx.AsyncClient:
+    """Create the async HTTP client."""
+    transport = httpx.AsyncHTTPTransport(
+        verify=_SSL_CONTEXT if verify else False,
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+    )
+    return httpx.AsyncClient(transport=transport, timeout=15, follow_redirects=True)
+
+# Response headers kept with a cached page (validators for contacts_cache)
+_CACHED_HEADERS = ('content-type', 'etag', 'last-modified')
+
+def _page_cache_path(url: str) -> Path:
+    return HTTP_CACHE_DIR / (hashlib.sha1(url.encode()).hexdigest() + '.json')
+
+def _read_cached_page(url: str):
+    """Return (html, headers) cached within HTTP_CACHE_TTL, else None."""
+    path = _page_cache_path(url)
+    try:
+        if time.time() - path.stat().st_mtime > HTTP_CACHE_TTL:
+            return None
+        with open(path, encoding='utf-8') as f:
+            cached = json.load(f)
+        return cached['html'], httpx.Headers(cached['headers'])
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _prune_page_cache() -> None:
+    """Delete expired entries (and temp files left by crashed writes), at most once per interval."""
+    global _last_prune
+    now = time.time()
+    with _prune_lock:
+        if now - _last_prune < HTTP_CACHE_PRUNE_INTERVAL:
+            return
+        _last_prune = now
+    removed = 0
+    for path in HTTP_CACHE_DIR.glob('*'):
+        try:
+            if now - path.stat().st_mtime > HTTP_CACHE_TTL:
+                path.unlink()
+                removed += 1
+        except OSError:
+            pass  # Deleted by another process, or not ours to delete
+    if removed:
+        logger.info(f"Pruned {removed} expired pages from {HTTP_CACHE_DIR}")
+
+def _write_cached_page(url: str, html: str, headers) -> None:
+    """Store a fetched page (atomically, so concurrent readers never see half a file)."""
+    _prune_page_cache()
+    try:
+        HTTP_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        path = _page_cache_path(url)
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({
+                'url': url,
+                'html': html,
+                'headers': {k: headers[k] for k in _CACHED_HEADERS if k in headers},
+            }, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.debug(f"Could not cache {url}: {e}")
+
+# Pooled clients per event loop (httpx async clients can't cross loops), keyed
+# by verify flag, so DNS, keep-alive connections and TLS sessions carry over
+# from lead to lead
+_CLIENTS = weakref.WeakKeyDictionary()
+
+# Sync callers (thread pools) all share one background loop and its client
+_LOOP = None
+_LOOP_LOCK = threading.Lock()
+
+def get_http_client(verify: bool = True) -> httpx.AsyncClient:
+    """Return the shared client for the running event loop."""
+    clients = _CLIENTS.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(verify)
+    if client is None or client.is_closed:
+        client = clients[verify] = build_client(verify)
+    return client
+
+async def aclose_http_clients():
+    """Close the shared clients of the running event loop."""
+    for client in _CLIENTS.pop(asyncio.get_running_loop(), {}).values():
+        await client.aclose()
+
+def _is_tls_error(exc: BaseException) -> bool:
+    """True if an httpx error was caused by certificate/handshake failure."""
+    while exc is not None:
+        if isinstance(exc, ssl.SSLError):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+def _background_loop():
+    """Start (once) the event loop that scrape_website_contacts_sync runs on."""
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            _LOOP = asyncio.new_event_loop()
+            threading.Thread(target=_LOOP.run_forever, name="contacts-http", daemon=True).start()
+            atexit.register(_close_background_loop)
+    return _LOOP
+
+def _close_background_loop():
+    try:
+        asyncio.run_coroutine_threadsafe(aclose_http_clients(), _LOOP).result(timeout=5)
+    except Exception:
+        pass
+    _LOOP.call_soon_threadsafe(_LOOP.stop)
 
 def extract_emails(text):
     """Robust email extraction."""
     if not text:
         return []
-    # Basic regex
-    email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-    matches = re.findall(email_pattern, text)
-    
-    # Filter junk
-    valid_emails = set()
-    for email in matches:
-        email_lower = email.lower()
-        if any(email_lower.endswith(ext) for ext in IGNORED_EXTS):
-            continue
-        # Filter common false positives
-        if email_lower in ['name@example.com', 'email@address.com', 'you@yourdomain.com']:
-            continue
-        valid_emails.add(email)
-            
-    return list(valid_emails)
+    emails = {email.lower() for email in _EMAIL_RE.findall(text)} - _JUNK
+    return [email for email in emails if email.rpartition('.')[2] not in _BAD_EXT]
+
+def analyze_anchors(soup, base_url):
+    """
+    Single pass over <a href> tags collecting social media links and
+    Contact/About/Team pages.
 
-def extract_social_media(soup):
-    """Extract social media links."""
+    Returns:
+        Tuple of (socials dict, up to MAX_CONTACT_PAGES contact page URLs
+        in the order they appear on the page)
+    """
     socials = {}
-    platforms = ['facebook', 'twitter', 'linkedin', 'instagram', 'youtube', 'tiktok']
-    
-    if not soup:
-        return socials
-        
-    for a in soup.find_all('a', href=True):
-        href = a['href'].lower()
-        for platform in platforms:
-            if platform in href and platform not in socials:
-                socials[platform] = a['href']
-    return socials
-
-def get_contact_pages(soup, base_url):
-    """Find links to Contact, About, Team pages."""
-    keywords = ['contact', 'about', 'team', 'staff', 'people', 'leadership']
-    pages = set()
-    
+    pages = {}  # dict as an ordered set: keeps document order for fetches/logs
+
     if not soup:
-        return []
+        return socials, []
+
+    base_netloc = urlparse(base_url).netloc
 
     for a in soup.find_all('a', href=True):
         href = a['href']
-        # Normalize
+
+        # Social media
+        m = _SOCIAL_RE.search(href)
+        if m:
+            platform = m.group(1).lower()
+            if platform == 'x':
+                platform = 'twitter'
+            if platform not in socials:
+                socials[platform] = href
+
+        # Contact pages - stop looking once we have enough, and stop walking
+        # anchors entirely once every platform has been found as well
+        if len(pages) >= MAX_CONTACT_PAGES:
+            if len(socials) == len(SOCIAL_PLATFORMS):
+                break
+            continue
+
+        # Cheap prefilter before urljoin/urlparse: the keyword must be in the href
+        href_lower = href.lower()
+        if not any(k in href_lower for k in CONTACT_KEYWORDS):
+            continue
+
+        # Normalize and verify it's internal
         full_url = urljoin(base_url, href)
         parsed = urlparse(full_url)
-        
-        # Verify it's internal
-        if parsed.netloc != urlparse(base_url).netloc:
+        if parsed.netloc != base_netloc:
             continue
-            
-        # Check keywords
+
         path_lower = parsed.path.lower()
-        if any(k in path_lower for k in keywords):
-            pages.add(full_url)
-            
-    return list(pages)[:4]  # Limit to 4 extra pages
+        if any(k in path_lower for k in CONTACT_KEYWORDS):
+            pages[full_url] = None
+
+    return socials, list(pages)
+
+async def fetch_html(client, url, headers):
+    """
+    Stream a page and return (html, response headers), with the HTML
+    truncated at MAX_HTML_BYTES.
+
+    html is None for binary content types, which are rejected from the
+    headers before the body is downloaded. Raises on HTTP errors.
+    Pages are served from / saved to the on-disk page cache when enabled.
+    """
+    if HTTP_CACHE_TTL > 0:
+        cached = await asyncio.to_thread(_read_cached_page, url)
+        if cached is not None:
+            return cached
+
+    async with client.stream('GET', url, headers=headers) as resp:
+        resp.raise_for_status()
+        content_type = resp.headers.get('content-type', '').lower()
+        if content_type.startswith(BINARY_CONTENT_TYPES):
+            return None, resp.headers
+
+        chunks = []
+        size = 0
+        async for chunk in resp.aiter_bytes(65536):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= MAX_HTML_BYTES:
+                break
+        body = b''.join(chunks)[:MAX_HTML_BYTES]
+        html = body.decode(resp.encoding or 'utf-8', errors='replace')
+
+    if HTTP_CACHE_TTL > 0:
+        await asyncio.to_thread(_write_cached_page, url, html, resp.headers)
+    return html, resp.headers
 
 def search_duckduckgo(query):
     """Search DuckDuckGo for missing emails using the latest DDGS."""
@@ -145,9 +383,61 @@ def search_anymailfinder(business_name, website_url=None):
         logger.error(f"AnyMailFinder request failed: {e}")
         return []
 
-def scrape_website_contacts(url: str, business_name: str) -> dict:
+async def enrich_contacts(result: dict, business_name: str, url: str = None) -> dict:
+    """
+    Search-engine fallback for a scrape result that found no emails:
+    DuckDuckGo -> Social Search -> AnyMailFinder. Updates result in place.
+
+    duckduckgo_search and AnyMailFinder are blocking, so they run in threads.
+    """
+    collected_emails = set(result.get("emails", []))
+    search_enriched = result.get("_search_enriched", False)
+
+    if business_name:
+        # 3a. General Search
+        if not collected_emails:
+            search_query = f"{business_name} email contact"
+            found_emails = await asyncio.to_thread(search_duckduckgo, search_query)
+            if found_emails:
+                collected_emails.update(found_emails)
+                search_enriched = True
+        
+        # 3b. Social Search (Facebook/Instagram/LinkedIn)
+        # Try to find emails in social descriptions if standard methods failed
+        if not collected_emails:
+            logger.info(f"Running Social Search for {business_name}...")
+            social_query = f'site:facebook.com OR site:instagram.com OR site:linkedin.com "{business_name}" email'
+            social_emails = await asyncio.to_thread(search_duckduckgo, social_query)
+            if social_emails:
+                collected_emails.update(social_emails)
+                search_enriched = True
+        # 3c. AnyMailFinder Enrichment (Last Resort - High Quality)
+        if not collected_emails:
+            try:
+                anymail_emails = await asyncio.to_thread(search_anymailfinder, business_name, url)
+                if anymail_emails:
+                    collected_emails.update(anymail_emails)
+                    search_enriched = True
+            except Exception as e:
+                logger.error(f"AnyMailFinder step failed: {e}")
+
+    result["emails"] = list(collected_emails)
+    result["_search_enriched"] = search_enriched
+    result["needs_enrichment"] = False
+    return result
+
+async def scrape_website_contacts(url: str, business_name: str, enrich: bool = True, client: httpx.AsyncClient = None) -> dict:
     """
     Deep scrape: Home -> Contact Pages -> Search Engine
+
+    Sub-pages are fetched concurrently, so a lead costs roughly one homepage
+    round-trip plus the slowest sub-page rather than the sum of all of them.
+
+    With enrich=False the search-engine step is skipped and the result is
+    flagged "needs_enrichment" when no emails were found, so a batch driver
+    can run enrich_contacts as a separate, more tightly throttled pass.
+
+    Uses the shared client for the running loop unless one is passed in.
     """
     if not url:
         return {"error": "No URL provided"}
@@ -156,77 +446,68 @@ def scrape_website_contacts(url: str, business_name: str) -> dict:
         url = 'http://' + url
         
     headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
+        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml'
     }
     
     collected_emails = set()
     collected_socials = {}
     pages_scraped = 0
-    search_enriched = False
+    validators = {}
     
     try:
-        with httpx.Client(timeout=15, follow_redirects=True, verify=False) as client:
-            
-            # 1. Scrape Homepage
-            logger.info(f"Fetching {url}")
+        # Inside the try: client construction can fail too (e.g. h2 missing
+        # for http2=True), and this function must never raise
+        if client is None:
+            client = get_http_client()
+
+        # 1. Scrape Homepage
+        logger.info(f"Fetching {url}")
+        try:
             try:
-                resp = client.get(url, headers=headers)
-                resp.raise_for_status()
+                html, resp_headers = await fetch_html(client, url, headers)
+            except httpx.ConnectError as e:
+                if not _is_tls_error(e):
+                    raise
+                logger.warning(f"TLS verification failed for {url}, retrying without it")
+                client = get_http_client(verify=False)
+                html, resp_headers = await fetch_html(client, url, headers)
+            if html is None:
+                raise ValueError("Homepage is not HTML")
+            pages_scraped += 1
+            # Cache validators so callers can revalidate instead of rescraping
+            validators = {
+                "_etag": resp_headers.get('etag', ''),
+                "_last_modified": resp_headers.get('last-modified', '')
+            }
+            
+            soup = BeautifulSoup(html, 'lxml', parse_only=_ANCHOR_STRAINER)
+            text = _fast_html_to_text(html)
+            
+            # Extract
+            collected_emails.update(extract_emails(text))
+            socials, sub_pages = analyze_anchors(soup, url)
+            collected_socials.update(socials)
+            
+            # 2. Scrape Sub-pages (concurrently)
+            for sub_url in sub_pages:
+                logger.info(f"Fetching sub-page: {sub_url}")
+            sub_results = await asyncio.gather(
+                *[fetch_html(client, sub_url, headers) for sub_url in sub_pages],
+                return_exceptions=True
+            )
+            for sub_page in sub_results:
+                if isinstance(sub_page, Exception) or sub_page[0] is None:
+                    continue
+                sub_html = sub_page[0]
                 pages_scraped += 1
-                
-                soup = BeautifulSoup(resp.text, 'html.parser')
-                text = html2text.html2text(resp.text)
-                
-                # Extract
-                collected_emails.update(extract_emails(text))
-                collected_socials.update(extract_social_media(soup))
-                
-                # 2. Find & Scrape Sub-pages
-                sub_pages = get_contact_pages(soup, url)
-                for sub_url in sub_pages:
-                    logger.info(f"Fetching sub-page: {sub_url}")
-                    try:
-                        sub_resp = client.get(sub_url, headers=headers)
-                        pages_scraped += 1
-                        sub_text = html2text.html2text(sub_resp.text)
-                        collected_emails.update(extract_emails(sub_text))
-                    except Exception:
-                        continue
-                        
-            except Exception as e:
-                logger.error(f"Main site fetch failed: {e}")
+                sub_text = _fast_html_to_text(sub_html)
+                collected_emails.update(extract_emails(sub_text))
+                    
+        except Exception as e:
+            logger.error(f"Main site fetch failed: {e}")
 
-        # 3. Fallback: Search Engine Enrichment
-        if business_name:
-            # 3a. General Search
-            if not collected_emails:
-                search_query = f"{business_name} email contact"
-                found_emails = search_duckduckgo(search_query)
-                if found_emails:
-                    collected_emails.update(found_emails)
-                    search_enriched = True
-            
-            # 3b. Social Search (Facebook/Instagram/LinkedIn)
-            # Try to find emails in social descriptions if standard methods failed
-            if not collected_emails:
-                logger.info(f"Running Social Search for {business_name}...")
-                social_query = f'site:facebook.com OR site:instagram.com OR site:linkedin.com "{business_name}" email'
-                social_emails = search_duckduckgo(social_query)
-                if social_emails:
-                    collected_emails.update(social_emails)
-                    search_enriched = True
-            # 3c. AnyMailFinder Enrichment (Last Resort - High Quality)
-            if not collected_emails:
-                try:
-                    anymail_emails = search_anymailfinder(business_name, url)
-                    if anymail_emails:
-                        collected_emails.update(anymail_emails)
-                        search_enriched = True
-                except Exception as e:
-                    logger.error(f"AnyMailFinder step failed: {e}")
-                
-        # 4. Return Results
-        return {
+        result = {
             "emails": list(collected_emails),
             "social_media": collected_socials,
             "owner_info": {},
@@ -235,8 +516,17 @@ def scrape_website_contacts(url: str, business_name: str) -> dict:
             "business_hours": "",
             "additional_contacts": [],
             "_pages_scraped": pages_scraped,
-            "_search_enriched": search_enriched
+            "_search_enriched": False,
+            "needs_enrichment": not collected_emails,
+            **validators
         }
+
+        # 3. Fallback: Search Engine Enrichment
+        if enrich and result["needs_enrichment"]:
+            await enrich_contacts(result, business_name, url)
+
+        # 4. Return Results
+        return result
         
     except Exception as e:
         logger.error(f"Critical error: {e}")
@@ -246,8 +536,19 @@ def scrape_website_contacts(url: str, business_name: str) -> dict:
             "_pages_scraped": pages_scraped
         }
 
+def scrape_website_contacts_sync(url: str, business_name: str) -> dict:
+    """
+    Blocking wrapper around scrape_website_contacts for thread-pool callers.
+
+    Runs on a shared background loop so every caller reuses one connection pool.
+    """
+    future = asyncio.run_coroutine_threadsafe(
+        scrape_website_contacts(url, business_name), _background_loop()
+    )
+    return future.result()
+
 if __name__ == "__main__":
     import sys
     url = sys.argv[1] if len(sys.argv) > 1 else "https://example.com"
     name = sys.argv[2] if len(sys.argv) > 2 else "Test Business"
-    print(scrape_website_contacts(url, name))
+    print(scrape_website_contacts_sync(url, name))
@@ -14,21 +14,46 @@ Usage:
 """
 
 import os
+import re
 import sys
+import time
+import random
 import json
+import csv
 import argparse
 import hashlib
+import unicodedata
+import functools
+import asyncio
+import threading
+import contextlib
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import namedtuple
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 
 import gspread
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 
+try:
+    import tldextract
+    # Bundled suffix list only - no network fetch on first use
+    _TLD_EXTRACT = tldextract.TLDExtract(suffix_list_urls=())
+except ImportError:
+    _TLD_EXTRACT = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Import our modules
 from scrape_google_maps import scrape_google_maps
-from extract_website_contacts import scrape_website_contacts
+from extract_website_contacts import scrape_website_contacts, enrich_contacts, aclose_http_clients
+import contacts_cache
+import sheet_client
+import lead_index
 
 load_dotenv()
 
@@ -41,6 +66,33 @@ SCOPES = [
 # Default sheet name for leads
 DEFAULT_SHEET_NAME = "GMaps Lead Database"
 
+# Resolved Drive folder IDs, keyed by account, so runs skip the folder search
+FOLDER_CACHE_FILE = os.path.expanduser("~/.cache/low-stem-lab/folder_id")
+
+# Website enrichment is network-bound (async tasks mostly wait on sockets), so
+# concurrency is sized well above the CPU count. Override with GMAPS_ENRICH_WORKERS.
+DEFAULT_ENRICH_WORKERS = int(os.getenv("GMAPS_ENRICH_WORKERS", min(32, 4 * (os.cpu_count() or 1))))
+# Search fallback (DuckDuckGo/social/AnyMailFinder) for sites without emails
+# runs as a second pass at this much lower concurrency: it's the slowest and
+# most rate-limited source, so it mustn't hold website workers or domain locks
+SEARCH_ENRICH_WORKERS = int(os.getenv("GMAPS_SEARCH_WORKERS", 3))
+
+# Process-wide, not per call: drivers run several pipelines at once, each on
+# its own thread and event loop, and both limits must hold across all of them
+_SEARCH_SLOTS = threading.BoundedSemaphore(SEARCH_ENRICH_WORKERS)
+_DOMAIN_LOCKS = {}
+_DOMAIN_LOCKS_GUARD = threading.Lock()
+
+# Rows per Sheets values.append request (well under the ~10 MB request cap)
+SHEETS_APPEND_BATCH = 500
+# Retries (with exponential backoff) of a values.append rejected with 429.
+# Only 429s: an append that failed with a 5xx or timed out may have landed,
+# and repeating it would duplicate rows.
+SHEETS_API_RETRIES = 5
+
+# Sheets API clients, one per thread (the underlying httplib2 transport isn't thread-safe)
+_sheets_local = threading.local()
+
 # Lead schema - columns for the Google Sheet
 LEAD_COLUMNS = [
     "lead_id",
@@ -88,30 +140,70 @@ LEAD_COLUMNS = [
     "enrichment_status",
 ]
 
+# Lead row: field access by name (lead.emails), serializes with list(lead)
+Lead = namedtuple("Lead", LEAD_COLUMNS)
+
+# Address parsing patterns, compiled once rather than per lead
+_ZIP_RE = re.compile(r'\b(\d{5}(?:-\d{4})?)\b')
+_STATE_RE = re.compile(r'\b([A-Z]{2})\b')
+_WS_RE = re.compile(r'\s+')
+
+
+@functools.lru_cache(maxsize=64)
+def _city_re(state: str) -> re.Pattern:
+    """City pattern for a given state code (the part before ', STATE')."""
+    return re.compile(rf',\s*([^,]+),?\s*{re.escape(state)}')
+
 
 def generate_lead_id(business_name: str, address: str) -> str:
     """Generate a unique ID for a lead based on name and address."""
-    unique_string = f"{business_name}|{address}".lower()
-    return hashlib.md5(unique_string.encode()).hexdigest()[:12]
+    # NFKC + casefold so composed/decomposed accents and full-width forms
+    # collapse to one ID; plain single-spaced ASCII input hashes as before
+    unique_string = unicodedata.normalize("NFKC", f"{business_name}|{address}").casefold()
+    unique_string = _WS_RE.sub(" ", unique_string).strip()
+    # Dedup key, not a security boundary; IDs must stay MD5 to match existing sheets
+    return hashlib.md5(unique_string.encode(), usedforsecurity=False).hexdigest()[:12]
+
+
+def registrable_domain(url: str) -> str:
+    """Registrable domain of a website (e.g. 'smiles.co.uk'), used to rate-limit per host."""
+    if _TLD_EXTRACT:
+        ext = _TLD_EXTRACT(url)
+        if ext.registered_domain:
+            return ext.registered_domain.lower()
+    netloc = urlparse(url if "//" in url else f"//{url}").netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+def _join_list(value) -> str:
+    # Filter out empty values and convert to comma-separated string
+    return ", ".join(map(str, filter(None, value)))
+
+
+def _join_dict(value) -> str:
+    # Convert dict to a readable string format
+    return "; ".join(f"{k}: {v}" for k, v in value.items() if v)
+
+
+# stringify_value converters keyed by exact type; subclasses are resolved
+# through _STRINGIFY_BASES on first sight and cached here
+_STRINGIFY = {
+    type(None): lambda v: "",
+    str: lambda v: v,
+    list: _join_list,
+    tuple: _join_list,
+    dict: _join_dict,
+}
+_STRINGIFY_BASES = ((str, _STRINGIFY[str]), ((list, tuple), _join_list), (dict, _join_dict))
 
 
 def stringify_value(value) -> str:
     """Convert any value to a string suitable for Google Sheets."""
-    if value is None:
-        return ""
-    if isinstance(value, str):
-        return value
-    if isinstance(value, (list, tuple)):
-        # Filter out None values and convert to comma-separated string
-        return ", ".join(str(v) for v in value if v)
-    if isinstance(value, dict):
-        # Convert dict to a readable string format
-        parts = []
-        for k, v in value.items():
-            if v:
-                parts.append(f"{k}: {v}")
-        return "; ".join(parts) if parts else ""
-    return str(value)
+    convert = _STRINGIFY.get(type(value))
+    if convert is None:
+        convert = next((f for base, f in _STRINGIFY_BASES if isinstance(value, base)), str)
+        _STRINGIFY[type(value)] = convert
+    return convert(value)
 
 
 def parse_address(address: str) -> dict:
@@ -128,26 +220,25 @@ def parse_address(address: str) -> dict:
         return parts
 
     # Try to extract zip code
-    import re
-    zip_match = re.search(r'\b(\d{5}(?:-\d{4})?)\b', address)
+    zip_match = _ZIP_RE.search(address)
     if zip_match:
         parts["zip_code"] = zip_match.group(1)
 
     # Try to extract state (2-letter code)
-    state_match = re.search(r'\b([A-Z]{2})\b', address)
+    state_match = _STATE_RE.search(address)
     if state_match:
         parts["state"] = state_match.group(1)
 
     # City is harder - take the part before the state
     if parts["state"]:
-        city_match = re.search(rf',\s*([^,]+),?\s*{parts["state"]}', address)
+        city_match = _city_re(parts["state"]).search(address)
         if city_match:
             parts["city"] = city_match.group(1).strip()
 
     return parts
 
 
-def flatten_lead(gmaps_data: dict, contacts: dict, search_query: str) -> dict:
+def flatten_lead(gmaps_data: dict, contacts: dict, search_query: str, scraped_at: str = None) -> Lead:
     """
     Flatten Google Maps data and extracted contacts into a single lead record.
 
@@ -155,9 +246,10 @@ def flatten_lead(gmaps_data: dict, contacts: dict, search_query: str) -> dict:
         gmaps_data: Raw data from Google Maps scraper
         contacts: Extracted contact data from website
         search_query: Original search query
+        scraped_at: ISO timestamp for the batch (defaults to now)
 
     Returns:
-        Flattened dictionary matching LEAD_COLUMNS schema
+        Lead tuple in LEAD_COLUMNS order
     """
     # Parse address components
     address = gmaps_data.get("address", "")
@@ -189,51 +281,68 @@ def flatten_lead(gmaps_data: dict, contacts: dict, search_query: str) -> dict:
     if contacts.get("error"):
         enrichment_status = f"error: {contacts.get('error')}"
 
-    return {
-        "lead_id": lead_id,
-        "scraped_at": datetime.now().isoformat(),
-        "search_query": search_query,
+    return Lead(
+        lead_id=lead_id,
+        scraped_at=scraped_at or datetime.now().isoformat(),
+        search_query=search_query,
         # Business basics
-        "business_name": gmaps_data.get("title", ""),
-        "category": gmaps_data.get("categoryName", ""),
-        "address": address,
-        "city": addr_parts["city"] or gmaps_data.get("city", ""),
-        "state": addr_parts["state"] or gmaps_data.get("state", ""),
-        "zip_code": addr_parts["zip_code"] or gmaps_data.get("postalCode", ""),
-        "country": gmaps_data.get("countryCode", "USA"),
-        "phone": gmaps_data.get("phone", ""),
-        "website": gmaps_data.get("website", ""),
-        "google_maps_url": gmaps_data.get("url", ""),
-        "place_id": gmaps_data.get("placeId", ""),
+        business_name=gmaps_data.get("title", ""),
+        category=gmaps_data.get("categoryName", ""),
+        address=address,
+        city=addr_parts["city"] or gmaps_data.get("city", ""),
+        state=addr_parts["state"] or gmaps_data.get("state", ""),
+        zip_code=addr_parts["zip_code"] or gmaps_data.get("postalCode", ""),
+        country=gmaps_data.get("countryCode", "USA"),
+        phone=gmaps_data.get("phone", ""),
+        website=gmaps_data.get("website", ""),
+        google_maps_url=gmaps_data.get("url", ""),
+        place_id=gmaps_data.get("placeId", ""),
         # Ratings
-        "rating": gmaps_data.get("totalScore", ""),
-        "review_count": gmaps_data.get("reviewsCount", ""),
-        "price_level": gmaps_data.get("price", ""),
+        rating=gmaps_data.get("totalScore", ""),
+        review_count=gmaps_data.get("reviewsCount", ""),
+        price_level=gmaps_data.get("price", ""),
         # Extracted contacts
-        "emails": stringify_value(emails),
-        "additional_phones": stringify_value(phones),
-        "business_hours": stringify_value(contacts.get("business_hours", "")),
+        emails=stringify_value(emails),
+        additional_phones=stringify_value(phones),
+        business_hours=stringify_value(contacts.get("business_hours", "")),
         # Social media
-        "facebook": stringify_value(social.get("facebook", "")),
-        "twitter": stringify_value(social.get("twitter", "")),
-        "linkedin": stringify_value(social.get("linkedin", "")),
-        "instagram": stringify_value(social.get("instagram", "")),
-        "youtube": stringify_value(social.get("youtube", "")),
-        "tiktok": stringify_value(social.get("tiktok", "")),
+        facebook=stringify_value(social.get("facebook", "")),
+        twitter=stringify_value(social.get("twitter", "")),
+        linkedin=stringify_value(social.get("linkedin", "")),
+        instagram=stringify_value(social.get("instagram", "")),
+        youtube=stringify_value(social.get("youtube", "")),
+        tiktok=stringify_value(social.get("tiktok", "")),
         # Owner info
-        "owner_name": stringify_value(owner.get("name", "")),
-        "owner_title": stringify_value(owner.get("title", "")),
-        "owner_email": stringify_value(owner.get("email", "")),
-        "owner_phone": stringify_value(owner.get("phone", "")),
-        "owner_linkedin": stringify_value(owner.get("linkedin", "")),
+        owner_name=stringify_value(owner.get("name", "")),
+        owner_title=stringify_value(owner.get("title", "")),
+        owner_email=stringify_value(owner.get("email", "")),
+        owner_phone=stringify_value(owner.get("phone", "")),
+        owner_linkedin=stringify_value(owner.get("linkedin", "")),
         # Team
-        "team_contacts": team_json,
+        team_contacts=team_json,
         # Additional
-        "additional_contact_methods": stringify_value(additional_contacts),
-        "pages_scraped": contacts.get("_pages_scraped", 0),
-        "search_enriched": "yes" if contacts.get("_search_enriched") else "no",
-        "enrichment_status": enrichment_status,
-    }
+        additional_contact_methods=stringify_value(additional_contacts),
+        pages_scraped=contacts.get("_pages_scraped", 0),
+        search_enriched="yes" if contacts.get("_search_enriched") else "no",
+        enrichment_status=enrichment_status,
+    )
+
+
+def dump_json(obj, path: str) -> None:
+    """Write an intermediate .tmp JSON file (orjson when installed, else stdlib)."""
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, "w") as f:
+            json.dump(obj, f, indent=2)
+
+
+def flatten_leads(enriched: list[dict], search_query: str, scraped_at: str = None):
+    """Yield a Lead per enriched business, sharing one scraped_at timestamp."""
+    scraped_at = scraped_at or datetime.now().isoformat()
+    for item in enriched:
+        yield flatten_lead(item["gmaps"], item["contacts"], search_query, scraped_at=scraped_at)
 
 
 def get_credentials():
@@ -282,6 +391,22 @@ def get_credentials():
     return creds
 
 
+@functools.lru_cache(maxsize=1)
+def get_gspread_client() -> gspread.Client:
+    """
+    Authorized gspread client for this process.
+
+    With a service account this is the same client sheet_client hands to the
+    other sheet scripts; otherwise it wraps the user OAuth credentials.
+    """
+    if os.path.exists(sheet_client.CREDENTIALS_FILE):
+        try:
+            return sheet_client.get_client()
+        except Exception as e:
+            print(f"Error loading service account: {e}")
+    return sheet_client.authorize(get_credentials())
+
+
 def get_or_create_sheet(sheet_url: str = None, sheet_name: str = None, use_folders: bool = False) -> tuple:
     """
     Get existing sheet or create a new one.
@@ -294,8 +419,7 @@ def get_or_create_sheet(sheet_url: str = None, sheet_name: str = None, use_folde
     Returns:
         Tuple of (spreadsheet, worksheet, is_new)
     """
-    creds = get_credentials()
-    client = gspread.authorize(creds)
+    client = get_gspread_client()
 
     if sheet_url:
         # Open existing sheet by URL
@@ -304,7 +428,7 @@ def get_or_create_sheet(sheet_url: str = None, sheet_name: str = None, use_folde
         else:
             sheet_id = sheet_url
 
-        spreadsheet = client.open_by_key(sheet_id)
+        spreadsheet = sheet_client.open_sheet(sheet_id, client)
         worksheet = spreadsheet.sheet1
         is_new = False
         print(f"Opened existing sheet: {spreadsheet.title}")
@@ -328,13 +452,20 @@ def get_or_create_sheet(sheet_url: str = None, sheet_name: str = None, use_folde
         name = sheet_name or f"Leads - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
         
         if use_folders:
+            creds = None
             try:
-                # Try to organize in folders
-                folder_id = get_target_folder_id(creds)
-                sheet_id = create_sheet_in_folder(creds, folder_id, name)
+                # Try to organize in folders (one Drive client for lookup + create)
+                from googleapiclient.discovery import build
+                creds = get_credentials()
+                service = build('drive', 'v3', credentials=creds)
+                folder_id = get_target_folder_id(creds, service=service)
+                sheet_id = create_sheet_in_folder(creds, folder_id, name, service=service)
                 spreadsheet = client.open_by_key(sheet_id)
             except Exception as e:
                 print(f"Warning: Could not save to folder ({e}). Falling back to root.")
+                # The cached folder may have been deleted or unshared
+                if creds is not None:
+                    _cache_folder_id(creds, None)
                 spreadsheet = client.create(name)
         else:
             spreadsheet = client.create(name)
@@ -379,44 +510,83 @@ def find_or_create_folder(drive_service, parent_id: str, folder_name: str) -> st
     return folder['id']
 
 
-def get_target_folder_id(creds, root_folder_name: str = "antigravity_scripts") -> str:
+def _folder_cache_key(creds) -> str:
+    return getattr(creds, "service_account_email", None) or "oauth"
+
+
+def _cached_folder_id(creds) -> str | None:
+    try:
+        with open(FOLDER_CACHE_FILE) as f:
+            return json.load(f).get(_folder_cache_key(creds))
+    except (OSError, ValueError):
+        return None
+
+
+def _cache_folder_id(creds, folder_id: str | None) -> None:
+    """Remember (or with None, forget) the folder ID for this account."""
+    try:
+        with open(FOLDER_CACHE_FILE) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    key = _folder_cache_key(creds)
+    if folder_id:
+        cache[key] = folder_id
+    elif cache.pop(key, None) is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(FOLDER_CACHE_FILE), exist_ok=True)
+        with open(FOLDER_CACHE_FILE, "w") as f:
+            json.dump(cache, f)
+    except OSError as e:
+        # Read-only home (CI, containers): the folder was still found, just not remembered
+        print(f"Warning: Could not cache folder ID ({e})")
+
+
+def get_target_folder_id(creds, root_folder_name: str = "antigravity_scripts", service=None) -> str:
     """
     Get the target folder ID. 
     Now flattened: just checks for the root folder 'antigravity_scripts'.
+
+    The resolved ID is cached per account in FOLDER_CACHE_FILE.
     """
-    from googleapiclient.discovery import build
-    
-    service = build('drive', 'v3', credentials=creds)
+    cached = _cached_folder_id(creds)
+    if cached:
+        return cached
+
+    if service is None:
+        from googleapiclient.discovery import build
+        service = build('drive', 'v3', credentials=creds)
     
-    # 1. Find the root folder (searching in shared drives and "My Drive")
-    query = f"mimeType='application/vnd.google-apps.folder' and name='{root_folder_name}' and trashed=false"
+    # Find the root folder, or "Antigravity Scrapes" if the user hasn't renamed
+    # it, in one query (searching in shared drives and "My Drive")
+    fallback_name = "Antigravity Scrapes"
+    query = (
+        f"mimeType='application/vnd.google-apps.folder' and trashed=false "
+        f"and (name='{root_folder_name}' or name='{fallback_name}')"
+    )
     results = service.files().list(q=query, fields="files(id, name)").execute()
     files = results.get('files', [])
     
     if not files:
-        # Fallback to check for "Antigravity Scrapes" if the user hasn't renamed it
-        fallback_name = "Antigravity Scrapes"
-        query_fb = f"mimeType='application/vnd.google-apps.folder' and name='{fallback_name}' and trashed=false"
-        results_fb = service.files().list(q=query_fb, fields="files(id, name)").execute()
-        files_fb = results_fb.get('files', [])
-        
-        if files_fb:
-            return files_fb[0]['id']
-            
         raise FileNotFoundError(
             f"Could not find a folder named '{root_folder_name}' (or '{fallback_name}') shared with this service account.\n"
             f"Please create a folder named '{root_folder_name}' in your Google Drive and share it with:\n"
             f"{creds.service_account_email}"
         )
     
-    return files[0]['id']
+    # Prefer the primary name when both exist
+    files.sort(key=lambda f: f['name'] != root_folder_name)
+    folder_id = files[0]['id']
+    _cache_folder_id(creds, folder_id)
+    return folder_id
 
 
-def create_sheet_in_folder(creds, folder_id: str, file_name: str):
+def create_sheet_in_folder(creds, folder_id: str, file_name: str, service=None):
     """Create a new Google Sheet inside a specific Drive folder."""
-    from googleapiclient.discovery import build
-    
-    service = build('drive', 'v3', credentials=creds)
+    if service is None:
+        from googleapiclient.discovery import build
+        service = build('drive', 'v3', credentials=creds)
     
     file_metadata = {
         'name': file_name,
@@ -428,50 +598,195 @@ def create_sheet_in_folder(creds, folder_id: str, file_name: str):
     return file['id']
 
 
+def get_sheets_service():
+    """Sheets v4 API client, built once per thread and reused across appends."""
+    service = getattr(_sheets_local, "service", None)
+    if service is None:
+        from googleapiclient.discovery import build
+        service = build('sheets', 'v4', credentials=get_credentials(), cache_discovery=False)
+        _sheets_local.service = service
+    return service
+
+
 def get_existing_lead_ids(worksheet) -> set:
-    """Get all existing lead IDs from the sheet to avoid duplicates."""
+    """
+    Get all existing lead IDs from the sheet to avoid duplicates.
+
+    Served from the local lead index (see lead_index); column A is only
+    downloaded when the index for this tab is missing or stale.
+    """
     try:
-        # Get all values in column A (lead_id)
-        lead_ids = worksheet.col_values(1)
-        return set(lead_ids[1:])  # Skip header
+        return lead_index.known_ids(worksheet)
     except Exception:
         return set()
 
 
-def append_leads_to_sheet(worksheet, leads: list[dict], existing_ids: set) -> int:
+def get_existing_place_ids(worksheet) -> set:
+    """Get the place_id column of a lead sheet (one values.get for one column)."""
+    try:
+        place_ids = worksheet.col_values(LEAD_COLUMNS.index("place_id") + 1)
+        return {pid for pid in place_ids[1:] if pid}  # Skip header
+    except Exception:
+        return set()
+
+
+def append_leads_to_sheet(
+    worksheet,
+    leads: list[Lead],
+    existing_ids: set,
+    batch_size: int = SHEETS_APPEND_BATCH,
+) -> int:
     """
     Append new leads to the sheet, skipping duplicates.
 
+    Rows go out batch_size at a time; a request rejected for quota (429) is
+    retried with exponential backoff. Other errors aren't retried, since the
+    append may already have been applied.
+
     Returns:
         Number of leads added
     """
-    # Filter out duplicates
-    new_leads = [lead for lead in leads if lead["lead_id"] not in existing_ids]
+    # Filter out duplicates and convert to rows in one pass (leads are
+    # already in column order, so lead_id is row[0])
+    rows = [list(lead) for lead in leads if lead.lead_id not in existing_ids]
+    added = len(rows)
 
-    if not new_leads:
+    if not added:
         print("No new leads to add (all duplicates)")
         return 0
 
-    # Convert to rows
-    rows = []
-    for lead in new_leads:
-        row = [lead.get(col, "") for col in LEAD_COLUMNS]
-        rows.append(row)
+    from googleapiclient.errors import HttpError
+
+    # Append through the Sheets API directly rather than gspread's append_rows
+    values_api = get_sheets_service().spreadsheets().values()
+    for start in range(0, added, batch_size):
+        batch = rows[start:start + batch_size]
+        request = values_api.append(
+            spreadsheetId=worksheet.spreadsheet.id,
+            range=sheet_client.a1_range(worksheet, "A1"),
+            valueInputOption='RAW',
+            insertDataOption='INSERT_ROWS',
+            body={'values': batch},
+        )
+        for attempt in range(SHEETS_API_RETRIES + 1):
+            try:
+                request.execute()
+                break
+            except HttpError as e:
+                if e.resp.status != 429 or attempt == SHEETS_API_RETRIES:
+                    raise
+                time.sleep(2 ** attempt + random.random())
+        lead_index.add_ids(worksheet, [row[0] for row in batch])
+
+    print(f"Added {added} new leads to sheet")
+    return added
+
 
-    # Batch append
-    worksheet.append_rows(rows, value_input_option='RAW')
+def _domain_lock(domain: str) -> threading.Lock:
+    """The process-wide lock serializing scrapes of one registrable domain."""
+    with _DOMAIN_LOCKS_GUARD:
+        return _DOMAIN_LOCKS.setdefault(domain, threading.Lock())
 
-    print(f"Added {len(new_leads)} new leads to sheet")
-    return len(new_leads)
+
+@contextlib.asynccontextmanager
+async def _hold(lock, poll: float = 0.05):
+    """
+    Hold a threading lock/semaphore from async code. Polls instead of
+    blocking a thread: waiting in to_thread could fill the executor that the
+    holder's own to_thread calls need.
+    """
+    while not lock.acquire(blocking=False):
+        await asyncio.sleep(poll)
+    try:
+        yield
+    finally:
+        lock.release()
 
 
-def enrich_businesses(businesses: list[dict], max_workers: int = 3) -> list[dict]:
+async def _enrich_async(with_websites: list[dict], max_workers: int, cache_ttl_days: float) -> list[dict]:
+    """
+    Scrape contacts for businesses with websites, at most max_workers at a
+    time, then run the search fallback for the ones that found no emails
+    (SEARCH_ENRICH_WORKERS at a time).
+    """
+    pending = iter(with_websites)
+    total = len(with_websites)
+    enriched = []
+    fresh = []  # Scraped this run (not from cache): stored once pass 2 is done
+
+    async def scrape_politely(business):
+        website = business["website"]
+        cached = await asyncio.to_thread(contacts_cache.lookup, website, cache_ttl_days)
+        if cached is not None:
+            return cached
+        async with _hold(_domain_lock(registrable_domain(website))):
+            contacts = await scrape_website_contacts(website, business.get("title"), enrich=False)
+        fresh.append((website, contacts))
+        return contacts
+
+    async def worker():
+        # Workers pull from one shared iterator, which bounds the in-flight
+        # scrapes (and live tasks) to max_workers
+        for business in pending:
+            try:
+                contacts = await scrape_politely(business)
+                enriched.append({
+                    "gmaps": business,
+                    "contacts": contacts
+                })
+                print(f"  [{len(enriched)}/{total}] Enriched: {business.get('title')}")
+            except Exception as e:
+                enriched.append({
+                    "gmaps": business,
+                    "contacts": {"error": str(e)}
+                })
+                print(f"  [{len(enriched)}/{total}] Error enriching {business.get('title')}: {e}")
+
+    async def search_enrich(entry):
+        business = entry["gmaps"]
+        async with _hold(_SEARCH_SLOTS):
+            try:
+                await enrich_contacts(entry["contacts"], business.get("title"), business["website"])
+            except Exception as e:
+                print(f"  Search enrichment failed for {business.get('title')}: {e}")
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(min(max_workers, total))))
+
+        needs_search = [e for e in enriched if e["contacts"].get("needs_enrichment")]
+        if needs_search:
+            print(f"  Search enrichment for {len(needs_search)} businesses without emails...")
+            await asyncio.gather(*(search_enrich(entry) for entry in needs_search))
+    finally:
+        await aclose_http_clients()
+
+    for website, contacts in fresh:
+        await asyncio.to_thread(contacts_cache.store, website, contacts)
+    return enriched
+
+
+def enrich_businesses(
+    businesses: list[dict],
+    max_workers: int = DEFAULT_ENRICH_WORKERS,
+    cache_ttl_days: float = contacts_cache.DEFAULT_TTL_DAYS,
+) -> list[dict]:
     """
     Enrich businesses with website contact information.
 
+    At most one scrape runs per registrable domain at a time, so chains and
+    franchises sharing a site aren't hammered by parallel workers. Sites
+    that yield no emails get the search fallback in a separate, smaller pass
+    (SEARCH_ENRICH_WORKERS, env GMAPS_SEARCH_WORKERS). Both limits are
+    process-wide, so they also hold across pipelines running in parallel
+    threads.
+
+    Results are cached per website (see contacts_cache), so re-runs over
+    overlapping queries only rescrape sites that changed.
+
     Args:
         businesses: List of business dicts from Google Maps
-        max_workers: Parallel workers for website scraping
+        max_workers: Concurrent website scrapes
+        cache_ttl_days: Reuse cached contacts younger than this without revalidating
 
     Returns:
         List of dicts with added contact information
@@ -493,33 +808,9 @@ def enrich_businesses(businesses: list[dict], max_workers: int = 3) -> list[dict
             "contacts": {"error": "No website available"}
         })
 
-    # Process businesses with websites in parallel
+    # Process businesses with websites concurrently on one event loop
     if with_websites:
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_business = {
-                executor.submit(
-                    scrape_website_contacts,
-                    business.get("website"),
-                    business.get("title")
-                ): business
-                for business in with_websites
-            }
-
-            for i, future in enumerate(as_completed(future_to_business), 1):
-                business = future_to_business[future]
-                try:
-                    contacts = future.result()
-                    enriched.append({
-                        "gmaps": business,
-                        "contacts": contacts
-                    })
-                    print(f"  [{i}/{len(with_websites)}] Enriched: {business.get('title')}")
-                except Exception as e:
-                    print(f"  [{i}/{len(with_websites)}] Error enriching {business.get('title')}: {e}")
-                    enriched.append({
-                        "gmaps": business,
-                        "contacts": {"error": str(e)}
-                    })
+        enriched.extend(asyncio.run(_enrich_async(with_websites, max_workers, cache_ttl_days)))
 
     return enriched
 
@@ -530,10 +821,14 @@ def run_pipeline(
     location: str = None,
     sheet_url: str = None,
     sheet_name: str = None,
-        workers: int = 3,
+        workers: int = DEFAULT_ENRICH_WORKERS,
         save_intermediate: bool = True,
         skip_sheets: bool = False,
         output_csv: str = None,
+        cache_ttl_days: float = contacts_cache.DEFAULT_TTL_DAYS,
+        return_leads: bool = False,
+        known_place_ids: set = None,
+        worksheet=None,
     ) -> dict:
     """
     Run the full lead generation pipeline.
@@ -548,18 +843,35 @@ def run_pipeline(
         save_intermediate: Whether to save intermediate JSON files
         skip_sheets: Skip Google Sheets saving
         output_csv: Path to save CSV output
+        cache_ttl_days: Days to reuse cached website contacts before revalidating
+        return_leads: Include the flattened Lead records as results["leads"]
+            (for callers that batch sheet writes across runs)
+        known_place_ids: Google place IDs to skip before enrichment. Place IDs
+            kept by this run are added to the set, so runs sharing it (e.g.
+            overlapping keyword searches) don't enrich the same business twice
+        worksheet: Already-open gspread worksheet to dedupe against and save
+            to; skips opening the sheet (callers running many queries against
+            one sheet open it once and pass it down)
 
     Returns:
         Dictionary with pipeline results
     """
+    # One clock read per run: reused for filenames and default sheet names
+    started = datetime.now()
+    timestamp = started.strftime("%Y%m%d_%H%M%S")
+    clean_query = search_query.replace(" ", "_").replace("/", "-")
+    default_sheet_name = f"{clean_query}_{started.strftime('%Y-%m-%d')}"
+
     results = {
         "search_query": search_query,
-        "started_at": datetime.now().isoformat(),
+        "started_at": started.isoformat(),
         "businesses_found": 0,
         "leads_enriched": 0,
         "leads_added": 0,
         "sheet_url": None,
-        "errors": []
+        "errors": [],
+        # True when the Maps scrape itself failed (vs. a search with no results)
+        "maps_failed": False,
     }
 
     # Step 1: Scrape Google Maps
@@ -567,11 +879,17 @@ def run_pipeline(
     print(f"STEP 1: Scraping Google Maps for '{search_query}'")
     print(f"{'='*60}")
 
-    businesses = scrape_google_maps(
-        search_query=search_query,
-        max_results=max_results,
-        location=location,
-    )
+    try:
+        businesses = scrape_google_maps(
+            search_query=search_query,
+            max_results=max_results,
+            location=location,
+            raise_on_error=True,
+        )
+    except Exception as e:
+        results["maps_failed"] = True
+        results["errors"].append(f"Google Maps scrape failed: {e}")
+        return results
 
     if not businesses:
         results["errors"].append("No businesses found on Google Maps")
@@ -583,51 +901,49 @@ def run_pipeline(
     # Save intermediate results
     if save_intermediate:
         os.makedirs(".tmp", exist_ok=True)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        with open(f".tmp/gmaps_raw_{timestamp}.json", "w") as f:
-            json.dump(businesses, f, indent=2)
+        dump_json(businesses, f".tmp/gmaps_raw_{timestamp}.json")
 
     # --- COST OPTIMIZATION: Deduplicate BEFORE enriching ---
-    if not skip_sheets and sheet_url:
+    # Enrichment is the expensive step, so drop businesses already in the
+    # target sheet (and repeats within this scrape) before it runs. The sheet
+    # handle and ID set are reused at save time.
+    existing_ids = set()
+    if not skip_sheets and (worksheet is not None or sheet_url):
         print(f"\n{'='*60}")
         print(f"Checking for existing leads to save costs...")
         try:
-            # 1. Connect to sheet early
-            clean_query = search_query.replace(" ", "_").replace("/", "-")
-            sheet_name_to_use = sheet_name or f"{clean_query}_{datetime.now().strftime('%Y-%m-%d')}"
-            
-            spreadsheet, worksheet, is_new = get_or_create_sheet(sheet_url, sheet_name_to_use, use_folders=True)
-            results["sheet_url"] = spreadsheet.url
+            # 1. Connect to sheet early (unless the caller passed a handle)
+            if worksheet is None:
+                sheet_name_to_use = sheet_name or default_sheet_name
+                spreadsheet, worksheet, is_new = get_or_create_sheet(sheet_url, sheet_name_to_use, use_folders=True)
+            results["sheet_url"] = worksheet.spreadsheet.url
             
             # 2. Get existing IDs
             existing_ids = get_existing_lead_ids(worksheet)
             print(f"Found {len(existing_ids)} existing leads in sheet.")
-            
-            # 3. Filter businesses
-            new_businesses = []
-            skipped_count = 0
-            
-            for b in businesses:
-                # Generate ID using same logic as flatten_lead
-                b_name = b.get("title", "")
-                b_address = b.get("address", "")
-                
-                # Check for ID
-                b_id = generate_lead_id(b_name, b_address)
-                
-                if b_id in existing_ids:
-                    skipped_count += 1
-                else:
-                    new_businesses.append(b)
-            
-            print(f"Skipped {skipped_count} duplicates.")
-            print(f"Proceeding with {len(new_businesses)} new businesses.")
-            
-            businesses = new_businesses
-            
         except Exception as e:
             print(f"Warning: Could not pre-filter duplicates: {e}")
             print("Will continue with all businesses and filter at save time.")
+
+    # 3. Filter businesses (ID uses the same logic as flatten_lead)
+    seen_ids = set(existing_ids)
+    new_businesses = []
+    for b in businesses:
+        place_id = b.get("placeId")
+        if known_place_ids is not None and place_id and place_id in known_place_ids:
+            continue
+        b_id = generate_lead_id(b.get("title", ""), b.get("address", ""))
+        if b_id not in seen_ids:
+            seen_ids.add(b_id)
+            new_businesses.append(b)
+            if known_place_ids is not None and place_id:
+                known_place_ids.add(place_id)
+
+    skipped_count = len(businesses) - len(new_businesses)
+    if skipped_count:
+        print(f"Skipped {skipped_count} duplicates.")
+        print(f"Proceeding with {len(new_businesses)} new businesses.")
+    businesses = new_businesses
     # -------------------------------------------------------
 
     # Step 2: Enrich with website data
@@ -636,7 +952,7 @@ def run_pipeline(
     print(f"{'='*60}")
 
     # Start enrichment only for filtered list
-    enriched = enrich_businesses(businesses, max_workers=workers)
+    enriched = enrich_businesses(businesses, max_workers=workers, cache_ttl_days=cache_ttl_days)
     results["leads_enriched"] = len(enriched)
 
     # Step 3: Flatten to lead records
@@ -644,54 +960,71 @@ def run_pipeline(
     print(f"STEP 3: Processing lead records")
     print(f"{'='*60}")
 
-    leads = []
-    for item in enriched:
-        lead = flatten_lead(item["gmaps"], item["contacts"], search_query)
-        leads.append(lead)
-
-    # Save intermediate enriched data
-    if save_intermediate:
-        with open(f".tmp/leads_enriched_{timestamp}.json", "w") as f:
-            json.dump(leads, f, indent=2)
-
-    # Step 4: Save outputs
-    print(f"\n{'='*60}")
-    print(f"STEP 4: Saving outputs")
-    print(f"{'='*60}")
-
-    # Save to CSV if requested
+    # CSV rows are written in the same pass as flattening
+    csv_file = csv_writer = None
     if output_csv:
         try:
-            import csv
             # Ensure output directory exists
             output_dir = os.path.dirname(output_csv)
             if output_dir:
                 os.makedirs(output_dir, exist_ok=True)
-                
-            with open(output_csv, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(LEAD_COLUMNS)
-                for lead in leads:
-                    writer.writerow([lead.get(col, "") for col in LEAD_COLUMNS])
-            print(f"Saved {len(leads)} leads to CSV: {output_csv}")
-            results["csv_path"] = output_csv
+
+            csv_file = open(output_csv, 'w', newline='', encoding='utf-8')
+            csv_writer = csv.writer(csv_file)
+            csv_writer.writerow(LEAD_COLUMNS)
         except Exception as e:
             results["errors"].append(f"CSV error: {str(e)}")
             print(f"Error saving to CSV: {e}")
 
+    # Only hold leads in memory if a later step needs the full list
+    keep_leads = save_intermediate or not skip_sheets or return_leads
+    leads = []
+    lead_count = 0
+    try:
+        for lead in flatten_leads(enriched, search_query):
+            lead_count += 1
+            if keep_leads:
+                leads.append(lead)
+            if csv_writer:
+                try:
+                    csv_writer.writerow(lead)
+                except Exception as e:
+                    results["errors"].append(f"CSV error: {str(e)}")
+                    print(f"Error saving to CSV: {e}")
+                    csv_writer = None
+    finally:
+        if csv_file:
+            csv_file.close()
+
+    if csv_writer:
+        print(f"Saved {lead_count} leads to CSV: {output_csv}")
+        results["csv_path"] = output_csv
+
+    if return_leads:
+        results["leads"] = leads
+
+    # Save intermediate enriched data
+    if save_intermediate:
+        dump_json([lead._asdict() for lead in leads], f".tmp/leads_enriched_{timestamp}.json")
+
+    # Step 4: Save outputs
+    print(f"\n{'='*60}")
+    print(f"STEP 4: Saving outputs")
+    print(f"{'='*60}")
+
     # Save to Google Sheets
     if not skip_sheets:
         try:
-            # Generate a descriptive name if not provided
-            if not sheet_name:
-                clean_query = search_query.replace(" ", "_").replace("/", "-")
-                timestamp = datetime.now().strftime("%Y-%m-%d")
-                sheet_name = f"{clean_query}_{timestamp}"
+            # Reuse the sheet opened for the pre-filter when there was one
+            if worksheet is None:
+                # Generate a descriptive name if not provided
+                if not sheet_name:
+                    sheet_name = default_sheet_name
 
-            spreadsheet, worksheet, is_new = get_or_create_sheet(sheet_url, sheet_name, use_folders=True)
-            results["sheet_url"] = spreadsheet.url
+                spreadsheet, worksheet, is_new = get_or_create_sheet(sheet_url, sheet_name, use_folders=True)
+                results["sheet_url"] = spreadsheet.url
+                existing_ids = get_existing_lead_ids(worksheet)
 
-            existing_ids = get_existing_lead_ids(worksheet)
             added = append_leads_to_sheet(worksheet, leads, existing_ids)
             results["leads_added"] = added
 
@@ -719,6 +1052,17 @@ def run_pipeline(
     return results
 
 
+async def run_pipeline_async(search_query: str, **kwargs) -> dict:
+    """
+    run_pipeline for asyncio callers fanning out many queries at once.
+
+    The Apify client and Sheets calls are blocking, so the pipeline runs in a
+    worker thread (its enrichment step gets its own event loop there).
+    Accepts the same keyword arguments as run_pipeline.
+    """
+    return await asyncio.to_thread(run_pipeline, search_query, **kwargs)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Google Maps Lead Generation Pipeline",
@@ -741,11 +1085,14 @@ Examples:
     parser.add_argument("--location", help="Location to focus search")
     parser.add_argument("--sheet-url", help="Existing Google Sheet URL to append to")
     parser.add_argument("--sheet-name", help="Name for new sheet (if not using existing)")
-    parser.add_argument("--workers", type=int, default=3, help="Parallel workers for enrichment (default: 3)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_ENRICH_WORKERS,
+                        help=f"Concurrent website scrapes for enrichment (default: {DEFAULT_ENRICH_WORKERS}, env GMAPS_ENRICH_WORKERS)")
     parser.add_argument("--no-intermediate", action="store_true", help="Don't save intermediate JSON files")
     parser.add_argument("--skip-sheets", action="store_true", help="Skip saving to Google Sheets")
     parser.add_argument("--output-csv", help="Save leads to CSV file")
     parser.add_argument("--json", action="store_true", help="Output results as JSON")
+    parser.add_argument("--cache-ttl-days", type=float, default=contacts_cache.DEFAULT_TTL_DAYS,
+                        help=f"Reuse cached website contacts for this many days before revalidating (default: {contacts_cache.DEFAULT_TTL_DAYS})")
 
     args = parser.parse_args()
 
@@ -759,6 +1106,7 @@ Examples:
         save_intermediate=not args.no_intermediate,
         skip_sheets=args.skip_sheets,
         output_csv=args.output_csv,
+        cache_ttl_days=args.cache_ttl_days,
     )
 
     if args.json:
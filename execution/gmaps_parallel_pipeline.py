@@ -7,7 +7,6 @@ Enriches businesses and saves to Google Sheet incrementally (every few leads).
 
 import os
 import sys
-import json
 import argparse
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -18,11 +17,12 @@ from dotenv import load_dotenv
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from scrape_google_maps import scrape_google_maps
-from extract_website_contacts import scrape_website_contacts
+from extract_website_contacts import scrape_website_contacts_sync
 from gmaps_lead_pipeline import (
     flatten_lead, get_or_create_sheet, get_existing_lead_ids,
-    LEAD_COLUMNS
+    dump_json, Lead
 )
+import lead_index
 
 load_dotenv()
 
@@ -30,9 +30,9 @@ load_dotenv()
 sheet_lock = Lock()
 
 
-def enrich_single(args: tuple) -> dict:
-    """Enrich a single business. Returns flattened lead dict."""
-    business, search_query, idx, total = args
+def enrich_single(args: tuple) -> Lead:
+    """Enrich a single business. Returns the flattened Lead."""
+    business, search_query, scraped_at, idx, total = args
     name = business.get("title", "Unknown")
     website = business.get("website")
 
@@ -40,24 +40,24 @@ def enrich_single(args: tuple) -> dict:
 
     if website:
         try:
-            contacts = scrape_website_contacts(website, name)
+            contacts = scrape_website_contacts_sync(website, name)
         except Exception as e:
             contacts = {"error": str(e)}
     else:
         contacts = {"error": "No website available"}
 
-    return flatten_lead(business, contacts, search_query)
+    return flatten_lead(business, contacts, search_query, scraped_at=scraped_at)
 
 
-def append_single_lead(worksheet, lead: dict, existing_ids: set) -> bool:
+def append_single_lead(worksheet, lead: Lead, existing_ids: set) -> bool:
     """Append a single lead to the sheet if not duplicate. Thread-safe."""
-    if lead["lead_id"] in existing_ids:
+    if lead.lead_id in existing_ids:
         return False
 
     with sheet_lock:
-        row = [lead.get(col, "") for col in LEAD_COLUMNS]
-        worksheet.append_row(row, value_input_option='RAW')
-        existing_ids.add(lead["lead_id"])
+        worksheet.append_row(list(lead), value_input_option='RAW')
+        existing_ids.add(lead.lead_id)
+        lead_index.add_ids(worksheet, [lead.lead_id])
     return True
 
 
@@ -102,8 +102,7 @@ def run_incremental_pipeline(
     # Save raw data
     os.makedirs(".tmp", exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    with open(f".tmp/gmaps_raw_{timestamp}.json", "w") as f:
-        json.dump(businesses, f, indent=2)
+    dump_json(businesses, f".tmp/gmaps_raw_{timestamp}.json")
 
     # Step 2: Set up Google Sheet
     print(f"\n{'='*60}")
@@ -127,7 +126,8 @@ def run_incremental_pipeline(
     print(f"{'='*60}")
 
     total = len(businesses)
-    tasks = [(b, search_query, i+1, total) for i, b in enumerate(businesses)]
+    scraped_at = datetime.now().isoformat()
+    tasks = [(b, search_query, scraped_at, i+1, total) for i, b in enumerate(businesses)]
 
     added_count = 0
     all_leads = []
@@ -143,9 +143,9 @@ def run_incremental_pipeline(
                 # Save immediately to sheet
                 if append_single_lead(worksheet, lead, existing_ids):
                     added_count += 1
-                    print(f"  ✓ Saved: {lead['business_name']} ({added_count} added)")
+                    print(f"  ✓ Saved: {lead.business_name} ({added_count} added)")
                 else:
-                    print(f"  - Skipped (duplicate): {lead['business_name']}")
+                    print(f"  - Skipped (duplicate): {lead.business_name}")
 
             except Exception as e:
                 task = futures[future]
@@ -153,8 +153,7 @@ def run_incremental_pipeline(
                 results["errors"].append(str(e))
 
     # Save local backup
-    with open(f".tmp/leads_enriched_{timestamp}.json", "w") as f:
-        json.dump(all_leads, f, indent=2)
+    dump_json([lead._asdict() for lead in all_leads], f".tmp/leads_enriched_{timestamp}.json")
 
     results["leads_added"] = added_count
     results["completed_at"] = datetime.now().isoformat()
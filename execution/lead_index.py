@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Local index of lead IDs already written to each Google Sheet tab.
+
+Deduping against the sheet used to download all of column A on every run.
+This keeps the same set in .tmp/lead_ids.sqlite, refreshed from the sheet
+(one values:batchGet call for column A) only when the local copy is missing
+or older than the TTL, and appended to whenever leads are written.
+
+Usage:
+    existing_ids = lead_index.known_ids(worksheet)
+    ...append rows...
+    lead_index.add_ids(worksheet, [lead.lead_id for lead in new_leads])
+"""
+
+import os
+import time
+import sqlite3
+import contextlib
+
+from sheet_client import a1_range
+
+INDEX_PATH = ".tmp/lead_ids.sqlite"
+# Rows deleted by hand in the sheet come back after at most this long
+DEFAULT_TTL_HOURS = float(os.getenv("LEAD_INDEX_TTL_HOURS", 24))
+
+
+@contextlib.contextmanager
+def _connect():
+    """Open the index DB (one connection per call, so it's safe from worker threads)."""
+    os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+    conn = sqlite3.connect(INDEX_PATH, timeout=30)
+    try:
+        with conn:  # commit on success, rollback on error
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS lead_ids (
+                    sheet_key TEXT NOT NULL,
+                    lead_id TEXT NOT NULL,
+                    UNIQUE (sheet_key, lead_id)
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS synced (
+                    sheet_key TEXT PRIMARY KEY,
+                    synced_at REAL
+                )"""
+            )
+            yield conn
+    finally:
+        conn.close()
+
+
+def _sheet_key(worksheet) -> str:
+    """Spreadsheet ID + tab ID, so tabs of the same spreadsheet don't share IDs."""
+    return f"{worksheet.spreadsheet.id}:{worksheet.id}"
+
+
+def _fetch_sheet_ids(worksheet) -> list[str]:
+    """Download column A as a single column (much less JSON than row-major)."""
+    response = worksheet.spreadsheet.values_batch_get(
+        [a1_range(worksheet, "A:A")],
+        params={"majorDimension": "COLUMNS"},
+    )
+    value_ranges = response.get("valueRanges", [])
+    columns = value_ranges[0].get("values", []) if value_ranges else []
+    return columns[0][1:] if columns else []  # Skip header
+
+
+def refresh(worksheet) -> set:
+    """Rebuild the local index for this tab from the sheet."""
+    key = _sheet_key(worksheet)
+    lead_ids = set(_fetch_sheet_ids(worksheet))
+    with _connect() as conn:
+        conn.execute("DELETE FROM lead_ids WHERE sheet_key = ?", (key,))
+        conn.executemany(
+            "INSERT OR IGNORE INTO lead_ids VALUES (?, ?)",
+            ((key, lead_id) for lead_id in lead_ids if lead_id)
+        )
+        conn.execute("INSERT OR REPLACE INTO synced VALUES (?, ?)", (key, time.time()))
+    return lead_ids
+
+
+def known_ids(worksheet, ttl_hours: float = DEFAULT_TTL_HOURS) -> set:
+    """
+    Lead IDs present in the sheet tab, from the local index when it's fresh.
+    """
+    key = _sheet_key(worksheet)
+    with _connect() as conn:
+        row = conn.execute("SELECT synced_at FROM synced WHERE sheet_key = ?", (key,)).fetchone()
+        if row and time.time() - row[0] < ttl_hours * 3600:
+            return {r[0] for r in conn.execute("SELECT lead_id FROM lead_ids WHERE sheet_key = ?", (key,))}
+    return refresh(worksheet)
+
+
+def add_ids(worksheet, lead_ids) -> None:
+    """Record IDs that were just appended to the sheet."""
+    key = _sheet_key(worksheet)
+    with _connect() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO lead_ids VALUES (?, ?)",
+            ((key, lead_id) for lead_id in lead_ids)
+        )
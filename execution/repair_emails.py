@@ -1,34 +1,40 @@
 
+import re
 import gspread
-import pandas as pd
 import sys
 import os
 import logging
-from google.oauth2.service_account import Credentials
+from itertools import zip_longest
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
 
-# Ensure current directory is in path for imports
-sys.path.append(os.getcwd())
+# Import siblings by bare name, like the pipeline does, so both share one
+# copy of each module (and one sheet_client cache) when loaded together
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from execution.extract_website_contacts import scrape_website_contacts
+from extract_website_contacts import scrape_website_contacts_sync
+import contacts_cache
+from sheet_client import open_sheet
 
 # Constants
 SHEET_URL = "https://docs.google.com/spreadsheets/d/1iiQvatTj9t0aYqcRS8i5Brxd-FezGmRHOGq5PlI1Qks"
-CREDENTIALS_FILE = "service_account.json"
-SCOPE = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive"
-]
+# Repaired cells are written in batches of this size (one API call each)
+BATCH_SIZE = 100
+# Rows scraped in parallel (scraping is network-bound)
+MAX_WORKERS = 10
+# A cell counts as having an email only if it starts with something email-shaped;
+# blanks, whitespace, "None", "n/a" and similar placeholders get repaired
+_EMAIL_OK = re.compile(r'[^@\s]+@[^@\s]+\.[^@\s]+')
 
 def connect_to_sheet():
     """Connect to Google Sheet and return the worksheet."""
     try:
-        creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPE)
-        client = gspread.authorize(creds)
-        sheet = client.open_by_url(SHEET_URL)
+        # Shared client/spreadsheet cache, so callers that also run the
+        # lead pipeline don't authorize twice
+        sheet = open_sheet(SHEET_URL)
         # Assuming the data is in the first sheet/tab
         worksheet = sheet.get_worksheet(0)
         return worksheet
@@ -36,75 +42,96 @@ def connect_to_sheet():
         logger.error(f"Failed to connect to Google Sheet: {e}")
         return None
 
+def find_email(website, name):
+    """Return the first email found for a business, or None. Runs in a worker thread."""
+    # Use existing extraction logic (which attempts deep search & social search)
+    # Use website if available, otherwise pass empty string to force search engine use
+    target_url = website if website else ""
+
+    # Reuse a cached scrape only if it found something - repairing
+    # means retrying the sites that previously came back empty
+    contact_data = contacts_cache.lookup(target_url)
+    if not (contact_data and contact_data.get('emails')):
+        contact_data = scrape_website_contacts_sync(target_url, name)
+        contacts_cache.store(target_url, contact_data)
+
+    found_emails = contact_data.get('emails', [])
+    return found_emails[0] if found_emails else None
+
 def repair_missing_emails():
     """Find rows without emails and try to find them using Deep Search."""
     worksheet = connect_to_sheet()
     if not worksheet:
         return
 
-    logger.info("Fetching data from Google Sheet...")
-    data = worksheet.get_all_records()
-    df = pd.DataFrame(data)
-    
-    # Identify rows with missing emails (empty string or None)
     # Adjust column name if your sheet uses 'Email' vs 'email'
     email_col = 'emails' 
     website_col = 'website'
     name_col = 'business_name'
 
-    if email_col not in df.columns:
-        logger.error(f"Column '{email_col}' not found in sheet columns: {df.columns}")
+    logger.info("Fetching data from Google Sheet...")
+    header = worksheet.row_values(1)
+    if email_col not in header:
+        logger.error(f"Column '{email_col}' not found in sheet columns: {header}")
         return
 
-    missing_mask = (df[email_col] == "") | (df[email_col].isnull())
-    missing_indices = df[missing_mask].index
+    # Only download the three columns we need (1-indexed), not the whole sheet
+    col_index = header.index(email_col) + 1
+    emails = worksheet.col_values(col_index)[1:]
+    websites = worksheet.col_values(header.index(website_col) + 1)[1:] if website_col in header else []
+    names = worksheet.col_values(header.index(name_col) + 1)[1:] if name_col in header else []
+
+    # col_values drops trailing empty cells, so pad the shorter columns
+    rows = list(zip_longest(emails, websites, names, fillvalue=""))
+
+    # Identify rows with missing or placeholder emails
+    missing_indices = [idx for idx, (email, _, _) in enumerate(rows) if not _EMAIL_OK.match(email.strip())]
     
     total_missing = len(missing_indices)
     logger.info(f"Found {total_missing} rows with missing emails.")
 
     repaired_count = 0
-    
-    for idx in missing_indices:
-        row = df.iloc[idx]
-        website = row.get(website_col)
-        name = row.get(name_col)
-        
-        # We need a website or at least a name to search
-        if not website and not name:
-            continue
-            
-        logger.info(f"[{repaired_count+1}/{total_missing}] Attempting repair for: {name} ({website})")
-        
-        # Use existing extraction logic (which attempts deep search & social search)
-        # Use website if available, otherwise pass empty string to force search engine use
-        target_url = website if website else "" 
-        
-        try:
-            contact_data = scrape_website_contacts(target_url, name)
-            found_emails = contact_data.get('emails', [])
-            
-            if found_emails:
-                primary_email = found_emails[0]
+    updates = []
+
+    # We need a website or at least a name to search
+    targets = [idx for idx in missing_indices if rows[idx][1] or rows[idx][2]]
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        future_to_idx = {
+            executor.submit(find_email, rows[idx][1], rows[idx][2]): idx
+            for idx in targets
+        }
+
+        for i, future in enumerate(as_completed(future_to_idx), 1):
+            idx = future_to_idx[future]
+            _, website, name = rows[idx]
+            logger.info(f"[{i}/{len(targets)}] {name} ({website})")
+
+            try:
+                primary_email = future.result()
+            except Exception as e:
+                logger.error(f"Error repairing row {idx}: {e}")
+                continue
+
+            if primary_email:
                 logger.info(f"  >>> SUCCESS: Found {primary_email}")
                 
-                # Update the DataFrame
-                df.at[idx, email_col] = primary_email
-                
-                # Update the ACTUAL Google Sheet (row by row to be safe/incremental)
+                # Queue the sheet update; flushed every BATCH_SIZE rows so a
+                # crash mid-run loses at most one batch
                 # gspread rows are 1-indexed, header is row 1, so row index idx is idx+2
-                cell_row = idx + 2
-                
-                # Find the column index for email (1-indexed)
-                col_index = df.columns.get_loc(email_col) + 1
-                
-                worksheet.update_cell(cell_row, col_index, primary_email)
+                updates.append({
+                    'range': gspread.utils.rowcol_to_a1(idx + 2, col_index),
+                    'values': [[primary_email]]
+                })
+                if len(updates) >= BATCH_SIZE:
+                    worksheet.batch_update(updates, value_input_option='RAW')
+                    updates = []
                 repaired_count += 1
             else:
                 logger.info("  >>> FAILED: No email found.")
-                
-        except Exception as e:
-            logger.error(f"Error repairing row {idx}: {e}")
-            continue
+
+    if updates:
+        worksheet.batch_update(updates, value_input_option='RAW')
 
     logger.info(f"REPAIR COMPLETE. Repaired {repaired_count} leads.")
 
@@ -1,58 +1,281 @@
-import sys
 import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ThreadPoolExecutor
 
-# Ensure execution directory is in path
-sys.path.append(os.path.join(os.getcwd(), 'execution'))
+try:
+    from tqdm import tqdm
+except ImportError:  # Optional: progress bar with ETA over the remaining queries
+    tqdm = None
 
-from gmaps_lead_pipeline import run_pipeline
+# Run as `python3 execution/scrape_bc_dentists.py` from any directory: the
+# script's own directory is sys.path[0], so siblings import by bare name
+# (the same way gmaps_lead_pipeline imports its helpers)
+from gmaps_lead_pipeline import (
+    run_pipeline_async, get_or_create_sheet, get_existing_lead_ids, get_existing_place_ids,
+    append_leads_to_sheet, Lead
+)
+
+logger = logging.getLogger(__name__)
+
+def setup_logging():
+    """
+    Timestamped logging through a queue: query threads only enqueue records,
+    and a listener thread formats and writes them. Returns the listener
+    (stop it on exit to flush).
+    """
+    log_queue = queue.SimpleQueue()
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(threadName)s] %(message)s'))
+    # Replace, not add to: importing the pipeline already ran basicConfig
+    # (extract_website_contacts), which installed a plain stderr handler
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+    listener = QueueListener(log_queue, console)
+    listener.start()
+    return listener
 
 KEYWORDS = [
     "Dentist", "Dental Clinic", "Orthodontist", "Oral Surgeon", 
     "Dental Hygiene Clinic", "Pediatric Dentist", "Cosmetic Dentistry", "Denture Clinic"
 ]
 
-CITIES = [
-    # --- METRO VANCOUVER ---
+METRO_VANCOUVER = [
     "Vancouver", "Surrey", "Burnaby", "Richmond", "Coquitlam", "Langley", "Delta", "North Vancouver", 
     "Maple Ridge", "New Westminster", "Port Coquitlam", "West Vancouver", "Port Moody", "Whiterock", 
     "Pitt Meadows", "Tsawwassen", "Ladner", "Fort Langley", "Aldergrove",
-    # --- VANCOUVER ISLAND ---
+]
+
+VANCOUVER_ISLAND = [
     "Victoria", "Nanaimo", "Saanich", "Duncan", "Comox", "Courtenay", "Campbell River", "Langford", 
     "Colwood", "Oak Bay", "Esquimalt", "Sooke", "Parksville", "Qualicum Beach", "Port Alberni", 
-    # --- FRASER VALLEY / INTERIOR / NORTH ---
-    "Abbotsford", "Chilliwack", "Mission", "Kelowna", "Kamloops", "Vernon", "Penticton", "Prince George"
-    # (Truncated for efficiency, but will search major hubs for all keywords first)
 ]
 
+FRASER_VALLEY = [
+    "Abbotsford", "Chilliwack", "Mission",
+]
+
+# (Truncated for efficiency, but will search major hubs for all keywords first)
+INTERIOR_NORTH = [
+    "Kelowna", "Kamloops", "Vernon", "Penticton", "Prince George",
+]
+
+REGIONS = {
+    "metro-vancouver": METRO_VANCOUVER,
+    "vancouver-island": VANCOUVER_ISLAND,
+    "fraser-valley": FRASER_VALLEY,
+    "interior-north": INTERIOR_NORTH,
+}
+
+def cities_for(regions):
+    """Cities of the given regions in order, each city once even if listed in several regions."""
+    return list(dict.fromkeys(city for region in regions for city in REGIONS[region]))
+
+CITIES = cities_for(REGIONS)
+
+def build_queries(keywords, cities):
+    """(keyword, city, search query) for every keyword x city, built once up front."""
+    return [(keyword, city, f"{keyword} in {city}, BC, Canada") for keyword in keywords for city in cities]
+
 SHEET_URL = "https://docs.google.com/spreadsheets/d/1iiQvatTj9t0aYqcRS8i5Brxd-FezGmRHOGq5PlI1Qks/edit?gid=0#gid=0"
 
-def main():
+# Google Maps results per (keyword, city) query
+MAX_RESULTS = 100
+
+# (keyword, city) queries run in parallel. Each runs its own Apify actor and
+# website enrichment, in its own thread.
+CITY_PARALLEL = int(os.environ.get("CITY_PARALLEL", 8))
+
+# Total website fetches in flight across all parallel queries
+ENRICH_BUDGET = 50
+
+# Website-enrichment concurrency inside each query: a quarter of the result
+# count, capped so CITY_PARALLEL queries together stay near ENRICH_BUDGET
+# (at least 4). Override with PIPELINE_WORKERS to tune per machine.
+WORKERS = int(os.environ.get(
+    "PIPELINE_WORKERS", max(4, min(32, MAX_RESULTS // 4, ENRICH_BUDGET // CITY_PARALLEL))
+))
+
+# Query order is shuffled with this seed (reproducible runs) so consecutive
+# queries hit different cities/keywords instead of bursting on one
+SHUFFLE_SEED = int(os.environ.get("SHUFFLE_SEED", 42))
+
+# Completed (keyword, city) shards and their leads, one JSON line each, so a
+# restart skips finished queries. Removed once the final sheet write succeeds.
+CHECKPOINT_PATH = ".tmp/bc_dentists_checkpoint.jsonl"
+
+def load_checkpoint():
+    """Return {(keyword, city): [Lead, ...]} for shards finished by an earlier run."""
+    done = {}
+    try:
+        with open(CHECKPOINT_PATH) as f:
+            for line in f:
+                try:
+                    shard = json.loads(line)
+                except ValueError:
+                    continue  # Partial last line from a crash mid-write
+                done[(shard["keyword"], shard["city"])] = [Lead(**lead) for lead in shard["leads"]]
+    except FileNotFoundError:
+        pass
+    return done
+
+def record_checkpoint(keyword, city, leads):
+    """Append a finished shard. Only called from the event loop thread, so writes never interleave."""
+    os.makedirs(os.path.dirname(CHECKPOINT_PATH), exist_ok=True)
+    with open(CHECKPOINT_PATH, "a") as f:
+        f.write(json.dumps({
+            "keyword": keyword,
+            "city": city,
+            "leads_found": len(leads),
+            "ts": time.time(),
+            "leads": [lead._asdict() for lead in leads],
+        }) + "\n")
+
+# Wall time of every finished shard, one JSON line each (appended across runs)
+# for spotting slow cities/keywords and tuning CITY_PARALLEL / WORKERS
+SHARD_TIMINGS_PATH = ".tmp/bc_dentists_shard_timings.jsonl"
+
+def record_shard_timing(keyword, city, leads_found, seconds):
+    """Append one shard's timing. Event loop thread only, like record_checkpoint."""
+    os.makedirs(os.path.dirname(SHARD_TIMINGS_PATH), exist_ok=True)
+    with open(SHARD_TIMINGS_PATH, "a") as f:
+        f.write(json.dumps({
+            "keyword": keyword,
+            "city": city,
+            "leads": leads_found,
+            "seconds": round(seconds, 3),
+            "city_parallel": CITY_PARALLEL,
+            "workers": WORKERS,
+            "ts": time.time(),
+        }) + "\n")
+
+async def scrape_query(sem, keyword, city, query, known_place_ids, progress=None):
+    """Run the pipeline for one (keyword, city) once a concurrency slot frees up."""
+    async with sem:
+        # Small jitter so queries released together don't start in lockstep
+        await asyncio.sleep(random.uniform(0, 0.1))
+        logger.info("Scraping %s in %s", keyword, city)
+        started = time.perf_counter()
+        try:
+            results = await run_pipeline_async(
+                query,
+                max_results=MAX_RESULTS,
+                workers=WORKERS,
+                save_intermediate=False,
+                skip_sheets=True,
+                return_leads=True,
+                known_place_ids=known_place_ids
+            )
+        finally:
+            if progress is not None:
+                progress.update()
+        seconds = time.perf_counter() - started
+        leads = results.get("leads", [])
+        logger.info("Finished %s in %s: %d leads in %.1fs", keyword, city, len(leads), seconds)
+        # A failed Maps scrape isn't marked done, or a restart would skip it
+        # for good; a search that just found nothing is done
+        if not results.get("maps_failed"):
+            record_checkpoint(keyword, city, leads)
+        record_shard_timing(keyword, city, len(leads), seconds)
+        return results
+
+async def main_async(keywords=KEYWORDS, cities=CITIES):
+    # run_pipeline is blocking, so each in-flight query holds a thread from
+    # this pool; size it to the query parallelism rather than asyncio's default
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=CITY_PARALLEL, thread_name_prefix="query")
+    )
+
+    # The sheet is opened once here and only touched again for the final
+    # write; queries never open it themselves (skip_sheets=True).
+    # Read it once up front: its place IDs seed the shared skip-set, so
+    # neither businesses already stored nor ones another keyword just found
+    # get enriched again
+    spreadsheet, worksheet, _ = await asyncio.to_thread(get_or_create_sheet, SHEET_URL)
+    existing_ids = await asyncio.to_thread(get_existing_lead_ids, worksheet)
+    known_place_ids = await asyncio.to_thread(get_existing_place_ids, worksheet)
+    logger.info("Sheet already has %d leads (%d place IDs)", len(existing_ids), len(known_place_ids))
+
+    # Resume: shards finished by an interrupted run aren't scraped again, and
+    # their (not yet written) leads join this session's write
+    done = load_checkpoint()
+    for leads in done.values():
+        known_place_ids.update(lead.place_id for lead in leads if lead.place_id)
+    if done:
+        logger.info("Resuming: %d queries already done (from %s)", len(done), CHECKPOINT_PATH)
+
+    sem = asyncio.Semaphore(CITY_PARALLEL)
+    queries = [q for q in build_queries(keywords, cities) if q[:2] not in done]
+    random.Random(SHUFFLE_SEED).shuffle(queries)
+    logger.info("%d queries, %d at a time, %d enrichment workers each", len(queries), CITY_PARALLEL, WORKERS)
+
+    progress = tqdm(total=len(queries), desc="scraping", unit="query") if tqdm else None
+    try:
+        results = await asyncio.gather(
+            *(scrape_query(sem, keyword, city, query, known_place_ids, progress)
+              for keyword, city, query in queries),
+            return_exceptions=True
+        )
+    finally:
+        if progress is not None:
+            progress.close()
+
+    # Dedupe across queries by lead_id (a business found by two keywords at
+    # the same moment can slip past the shared place-ID set)
+    session_leads = {}
+    for leads in done.values():
+        for lead in leads:
+            session_leads.setdefault(lead.lead_id, lead)
+    failed = 0
+    for (keyword, city, _), result in zip(queries, results):
+        if isinstance(result, Exception):
+            failed += 1
+            logger.error("Error scraping %s in %s: %s", keyword, city, result)
+            continue
+        if result.get("maps_failed"):
+            failed += 1
+            logger.error("Errors scraping %s in %s: %s", keyword, city, "; ".join(result["errors"]))
+        for lead in result.get("leads", []):
+            session_leads.setdefault(lead.lead_id, lead)
+    all_leads = list(session_leads.values())
+
+    # One sheet write for the whole session instead of one per query
     total_leads_added = 0
-    
-    for keyword in KEYWORDS:
-        print(f"\n\n#### STARTING NEW BATCH FOR KEYWORD: {keyword.upper()} ####")
-        for city in CITIES:
-            print(f"\n>>> SCRAPING: {keyword} in {city} <<<")
-            query = f"{keyword} in {city}, BC, Canada"
-            
-            try:
-                results = run_pipeline(
-                    search_query=query,
-                    max_results=100, 
-                    sheet_url=SHEET_URL,
-                    workers=25, 
-                    save_intermediate=True,
-                    skip_sheets=False
-                )
-                
-                added = results.get("leads_added", 0)
-                total_leads_added += added
-                print(f">>> FINISHED {city}. Added {added} new leads. Total this session: {total_leads_added}")
-                
-            except Exception as e:
-                print(f"!!! Error scraping {keyword} in {city}: {e}")
-                
-    print(f"\n\nMISSION COMPLETE. Total new leads added to sheet: {total_leads_added}")
+    if all_leads:
+        logger.info("Writing %d leads to sheet", len(all_leads))
+        # Default batch size: rows per append stay under the Sheets request cap
+        total_leads_added = await asyncio.to_thread(append_leads_to_sheet, worksheet, all_leads, existing_ids)
+
+    # Everything is in the sheet now, so the next run starts a fresh sweep.
+    # If queries failed, keep the checkpoint so a rerun retries only those
+    # (leads already written are deduped by lead_id).
+    if not failed and os.path.exists(CHECKPOINT_PATH):
+        os.remove(CHECKPOINT_PATH)
+
+    logger.info("Mission complete. Total new leads added to sheet: %d", total_leads_added)
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape BC dental leads across keywords x cities")
+    parser.add_argument("--keywords", nargs="+", default=KEYWORDS,
+                        help="Search keywords (default: all dental keywords)")
+    parser.add_argument("--regions", nargs="+", choices=list(REGIONS), default=list(REGIONS),
+                        help="Regions whose cities to search (default: all)")
+    args = parser.parse_args()
+
+    listener = setup_logging()
+    try:
+        asyncio.run(main_async(keywords=args.keywords, cities=cities_for(args.regions)))
+    finally:
+        listener.stop()
 
 if __name__ == "__main__":
     main()
@@ -25,6 +25,7 @@ def scrape_google_maps(
     max_results: int = 10,
     location: str = None,
     language: str = "en",
+    raise_on_error: bool = False,
 ) -> list[dict]:
     """
     Run the Apify Google Maps scraper actor.
@@ -34,14 +35,22 @@ def scrape_google_maps(
         max_results: Maximum number of places to scrape
         location: Optional location to focus the search
         language: Language code (default: en)
+        raise_on_error: Raise RuntimeError when the actor can't be run
+            instead of returning [], so callers can tell a failed scrape
+            from a search with no results
 
     Returns:
         List of business dictionaries with scraped data
     """
+    def fail(message):
+        if raise_on_error:
+            raise RuntimeError(message)
+        print(f"Error: {message}", file=sys.stderr)
+        return []
+
     api_token = os.getenv("APIFY_API_TOKEN")
     if not api_token:
-        print("Error: APIFY_API_TOKEN not found in .env", file=sys.stderr)
-        return []
+        return fail("APIFY_API_TOKEN not found in .env")
 
     client = ApifyClient(api_token)
 
@@ -63,12 +72,10 @@ def scrape_google_maps(
     try:
         run = client.actor(ACTOR_ID).call(run_input=run_input)
     except Exception as e:
-        print(f"Error running Apify actor: {e}", file=sys.stderr)
-        return []
+        return fail(f"Apify actor failed: {e}")
 
     if not run:
-        print("Error: Actor run failed to start", file=sys.stderr)
-        return []
+        return fail("Actor run failed to start")
 
     print(f"Scrape finished. Fetching results from dataset {run['defaultDatasetId']}...")
 
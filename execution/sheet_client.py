@@ -0,0 +1,54 @@
+"""
+Shared Google Sheets client for the lead-database scripts.
+
+Credentials and the authorized gspread client are built once per process,
+so scripts that run together (or call each other) skip re-parsing the
+service account key and the OAuth token exchange. Opened spreadsheets are
+cached too, so repeated lookups of the same sheet in one run are free.
+"""
+
+import functools
+
+import gspread
+from google.oauth2.service_account import Credentials
+from requests.adapters import HTTPAdapter
+
+CREDENTIALS_FILE = "service_account.json"
+SCOPE = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+# Keep-alive connections to the Sheets/Drive hosts
+POOL_SIZE = 32
+
+
+def authorize(creds) -> gspread.Client:
+    """gspread.authorize with a larger keep-alive pool on the underlying session."""
+    client = gspread.authorize(creds)
+    # gspread < 6 exposes the requests session as client.session, 6+ as client.http_client.session
+    session = getattr(client, "session", None) or getattr(getattr(client, "http_client", None), "session", None)
+    if session is not None:
+        session.mount("https://", HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE))
+    return client
+
+
+@functools.lru_cache(maxsize=1)
+def get_client() -> gspread.Client:
+    """Return the process-wide authorized gspread client (service account)."""
+    creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPE)
+    return authorize(creds)
+
+
+def open_sheet(key_or_url: str, client: gspread.Client = None) -> gspread.Spreadsheet:
+    """Open a spreadsheet by URL or key, once per process (a URL and its key share the cache entry)."""
+    if key_or_url.startswith("http"):
+        key_or_url = gspread.utils.extract_id_from_url(key_or_url)
+    return _open_by_key(key_or_url, client or get_client())
+
+
+@functools.lru_cache(maxsize=None)
+def _open_by_key(key: str, client: gspread.Client) -> gspread.Spreadsheet:
+    return client.open_by_key(key)
+
+
+def a1_range(worksheet, cells: str) -> str:
+    """A1 range on a worksheet's tab, e.g. 'Leads'!A:A (apostrophes in the title doubled)."""
+    title = worksheet.title.replace("'", "''")
+    return f"'{title}'!{cells}"